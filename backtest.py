@@ -0,0 +1,157 @@
+"""
+Backtest loop shared by the interactive run in `MAIN.py` and the evaluation modes.
+
+Key components:
+- `apply_stop_conditions`: Applies stop loss or stop win triggers to positions.
+- `run_strategy_loop`: Core loop running the strategy through market data and managing portfolio.
+
+"""
+from time import perf_counter
+
+import numpy as np
+
+from instrumentation import get_tracer, span
+
+def apply_stop_conditions(current_price, registry, condition_fn):
+    """
+    Check and apply stop loss or stop win conditions.
+
+    Args:
+        current_price (float): Current market price.
+        registry (dict): Dictionary mapping price levels to number of shares held
+                         under stop conditions.
+        condition_fn (callable): Function taking (current_price, stop_price) and
+                                 returning True if stop condition triggered.
+
+    Returns:
+        int: Number of shares to be bought/sold as a result of triggered stop conditions.
+
+    Side effects:
+        Removes triggered stop conditions from the registry.
+
+    """
+    actions_to_take = 0
+    keys_to_remove = []
+
+    for price, amount in registry.items():
+        if condition_fn(current_price, float(price)):
+            actions_to_take += amount
+            keys_to_remove.append(price)
+
+    for key in keys_to_remove:
+        del registry[key]
+
+    return actions_to_take
+
+
+def run_strategy_loop(data, strategy, capital, transaction_fee, yearly_custody_fee, to_precompute):
+    """
+    Simulate trading strategy over provided market data.
+
+    Args:
+        data (pandas.DataFrame): Market data with at least a 'Close' column.
+        strategy (Strategy): Trading strategy instance with an execute method.
+        capital (float): Initial capital available for trading.
+        transaction_fee (float): Proportional transaction fee per trade (e.g., 0.001 for 0.1%).
+        yearly_custody_fee (float): Annual custody fee rate deducted from capital yearly.
+        to_precompute (list): List of indicator functions to apply on data before simulation.
+
+    Returns:
+        dict: Dictionary containing time series lists:
+            - 'price': Market prices over time.
+            - 'capital': Available capital over time.
+            - 'stocks_owned': Number of shares owned over time.
+            - 'wealth': Total net worth (capital + stocks value) over time.
+
+    Notes:
+        - Applies precomputed features for strategy decision making.
+        - Enforces stop loss and stop win logic.
+        - Accounts for transaction costs and custody fees.
+        - Stops simulation if net worth reaches zero or below.
+
+    """
+    # --- Precompute features and indictators ---
+    with span("precompute"):
+        for stat in to_precompute:
+            data[stat.__name__] = stat(data)
+
+    prices = data['Close'].values
+    stocks_owned = 0
+    stop_losses_registry = {}
+    stop_win_registry = {}
+
+    arr_price, arr_capital, arr_stocks_owned, arr_wealth = [], [], [], []
+
+    # --- Instrumentation (when disabled: one None check and two false branches per bar) ---
+    tracer = get_tracer()
+    sample_every = tracer.sample_every if tracer is not None else 0
+    trades = 0
+
+    with span("loop", bars=len(prices)):
+        for i, current_price in enumerate(prices):
+            # Convert current_price to float if it's a NumPy scalar or array
+            if isinstance(current_price, np.ndarray):
+                if current_price.size == 1:
+                    current_price = current_price.item()
+                else:
+                    current_price = float(current_price[0])  # fallback
+            else:
+                current_price = float(current_price)
+
+            arr_price.append(current_price)
+
+            sampled = tracer is not None and i % sample_every == 0
+            if sampled:
+                strategy_start = perf_counter()
+
+            action, stop_loss, stop_win = strategy.execute(data[:i+1], stocks_owned, current_price, capital)
+
+            if sampled:
+                strategy_time = perf_counter() - strategy_start
+
+            if stop_loss:
+                stop_losses_registry[float(stop_loss[0])] = stop_losses_registry.get(float(stop_loss[0]), 0) + stop_loss[1]
+
+            if stop_win:
+                stop_win_registry[float(stop_win[0])] = stop_win_registry.get(float(stop_win[0]), 0) + stop_win[1]
+
+            action -= apply_stop_conditions(current_price, stop_losses_registry, lambda p, k: p < k)
+            action += apply_stop_conditions(current_price, stop_win_registry, lambda p, k: p > k)
+
+            if action < 0:
+                action = max(action, -stocks_owned)
+            elif action > 0:
+                max_affordable = capital / (current_price * (1 + transaction_fee))
+                action = min(action, max_affordable)
+
+            stocks_owned += action
+            arr_stocks_owned.append(stocks_owned)
+
+            trades += action != 0
+            if sampled:
+                tracer.sample(
+                    "run_strategy_loop", i,
+                    strategy_time=strategy_time,
+                    stop_book=len(stop_losses_registry) + len(stop_win_registry),
+                    trades=int(trades)
+                )
+
+            transaction_cost = transaction_fee * abs(action) * current_price
+            capital -= action * current_price + transaction_cost
+
+            if i % 365 == 0 and i > 0:
+                capital -= capital * yearly_custody_fee
+
+            arr_capital.append(float(capital))
+            wealth = stocks_owned * current_price + capital
+            arr_wealth.append(float(wealth))
+
+            if wealth <= 0:
+                break
+
+    return {
+        'price': arr_price,
+        'capital': arr_capital,
+        'stocks_owned': arr_stocks_owned,
+        'wealth': arr_wealth
+    }
@@ -0,0 +1,45 @@
+"""
+Synthetic, deterministic market data for the benchmarks. No network access.
+"""
+import numpy as np
+import pandas as pd
+
+SEED = 1234
+
+
+def synthetic_prices(size, seed=SEED, start_price=100.0):
+    """Geometric Brownian motion close prices of length `size`."""
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0003, 0.012, size)
+    return start_price * np.exp(np.cumsum(log_returns))
+
+
+def synthetic_ohlcv(size, seed=SEED):
+    """DataFrame with Open/High/Low/Close/Volume on business days, like `get_real_data`."""
+    rng = np.random.default_rng(seed)
+    close = synthetic_prices(size, seed)
+    open_ = close * (1 + rng.normal(0, 0.002, size))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.004, size)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.004, size)))
+    volume = rng.integers(1_000_000, 5_000_000, size)
+    index = pd.bdate_range("1990-01-01", periods=size)
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def synthetic_log_returns(size, seed=SEED):
+    """Daily log returns of length `size`."""
+    return np.diff(np.log(synthetic_prices(size + 1, seed)))
+
+
+def synthetic_market_rows(size, symbol="SYN", seed=SEED):
+    """Rows for `database.api.insert_market_data`."""
+    df = synthetic_ohlcv(size, seed)
+    return [
+        (timestamp.strftime("%Y-%m-%d"), symbol, float(o), float(h), float(l), float(c), int(v))
+        for timestamp, o, h, l, c, v in zip(df.index, df['Open'], df['High'], df['Low'], df['Close'], df['Volume'])
+    ]
+
+
+def stop_registry(size, low=90.0, high=110.0):
+    """Stop registry of `size` distinct price levels evenly spread over [low, high]."""
+    return {float(price): 0.1 for price in np.linspace(low, high, size)}
@@ -0,0 +1,324 @@
+"""
+Benchmark suite for the simulator's hot paths.
+
+Every benchmark runs on synthetic fixtures (no network) at several data sizes,
+so scaling curves are visible. Results are stored as JSON and can be compared
+against a previous run; the run fails when a benchmark got slower than the
+allowed threshold.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --output baseline.json
+    python -m benchmarks.run_benchmarks --baseline baseline.json --threshold 0.2
+    python -m benchmarks.run_benchmarks --filter features --sizes 1000,10000
+
+Result format:
+    {
+      "meta": {...},
+      "results": {
+        "<benchmark>": {"<size>": {"min": s, "median": s, "per_item": s, "calls": n}}
+      },
+      "errors": {"<benchmark>": {"<size>": "<exception>"}}
+    }
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import features.basic_features as basic_features
+import strategies.buy_one_sell_one
+import strategies.random_buy_sell
+import strategies.three_ema_crossover
+from backtest import apply_stop_conditions, run_strategy_loop
+from benchmarks import fixtures
+from database.api import create_db, fetch_market_data, initialize_db, insert_feature, insert_market_data, remove_feature
+from features.rolling import rolling_features
+from indicators.ema_crossover import indicator_three_ema_crossover
+from mathSim import calibrate_sv_model, generate_sv_paths
+from strategies.base import Strategy
+
+benchmark_registry = {}
+
+
+def register_benchmark(name, sizes):
+    """
+    Register a benchmark factory.
+
+    The factory takes a data size and returns a zero-argument callable that is timed.
+    All setup work belongs in the factory, outside of the timed callable.
+    """
+    def wrapper(fn):
+        benchmark_registry[name] = (fn, sizes)
+        return fn
+    return wrapper
+
+
+# --- Backtest loop ---
+LOOP_SIZES = [252, 1260, 2520]
+
+
+def _register_strategy_benchmark(strategy_name, strategy):
+    @register_benchmark(f"run_strategy_loop/{strategy_name}", LOOP_SIZES)
+    def bench(size):
+        data = fixtures.synthetic_ohlcv(size)
+        data['indicator_three_ema_crossover'] = indicator_three_ema_crossover(data)
+
+        def run():
+            random.seed(fixtures.SEED)
+            run_strategy_loop(data, strategy, 10000, 0.01, 0.02, [])
+        return run
+
+
+for _name, _strategy in Strategy.registry.items():
+    _register_strategy_benchmark(_name, _strategy)
+
+
+# --- Stop conditions ---
+STOP_SIZES = [100, 1000, 10000]
+
+
+@register_benchmark("apply_stop_conditions/no_trigger", STOP_SIZES)
+def bench_stops_no_trigger(size):
+    registry = fixtures.stop_registry(size)
+    return lambda: apply_stop_conditions(100.0, registry, lambda p, k: p < k - 50)
+
+
+@register_benchmark("apply_stop_conditions/half_trigger", STOP_SIZES)
+def bench_stops_half_trigger(size):
+    registry = fixtures.stop_registry(size)
+    # Triggered stops are removed from the registry, so every call gets a fresh copy (included in the timing).
+    return lambda: apply_stop_conditions(100.0, dict(registry), lambda p, k: p < k)
+
+
+# --- Simulation ---
+@register_benchmark("simulate/generate_sv_paths_1000", [252, 1260, 2520])
+def bench_generate_paths(size):
+    params = {'mu': 0.07, 'v0': 0.04, 'theta': 0.04, 'kappa': 2, 'xi': 0.2, 'rho': -0.7}
+    rng = np.random.default_rng(fixtures.SEED)
+    return lambda: generate_sv_paths(params, 1000, size, rng)
+
+
+@register_benchmark("simulate/calibrate_sv_model", [21, 63, 126])
+def bench_calibrate(size):
+    log_returns = fixtures.synthetic_log_returns(2520)
+    rng = np.random.default_rng(fixtures.SEED)
+    return lambda: calibrate_sv_model(log_returns, size, rng)
+
+
+# --- Features and indicators ---
+FEATURE_SIZES = [1000, 10000, 100000]
+
+
+def _register_feature_benchmark(feature_name, feature_fn):
+    @register_benchmark(f"features/{feature_name}", FEATURE_SIZES)
+    def bench(size):
+        data = fixtures.synthetic_ohlcv(size)
+        if feature_name == "feature_ema":
+            return lambda: feature_fn(data, span=21)
+        return lambda: feature_fn(data)
+
+
+for _name in sorted(dir(basic_features)):
+    if _name.startswith("feature_"):
+        _register_feature_benchmark(_name, getattr(basic_features, _name))
+
+
+@register_benchmark("features/rolling_features_1000_paths_20_stats", [252, 1260, 2520])
+def bench_rolling_batch(size):
+    paths = np.stack([fixtures.synthetic_prices(size, seed) for seed in range(1000)])
+    requests = [(statistic, window) for statistic in ("mean", "std", "zscore", "max", "min") for window in (5, 10, 20, 50)]
+    out = np.empty((len(requests),) + paths.shape)
+    return lambda: rolling_features(paths, requests, out=out)
+
+
+@register_benchmark("indicators/indicator_three_ema_crossover", FEATURE_SIZES)
+def bench_three_ema(size):
+    data = fixtures.synthetic_ohlcv(size)
+    return lambda: indicator_three_ema_crossover(data)
+
+
+# --- Database ---
+DB_SIZES = [1000, 10000]
+
+
+def _fresh_db(name):
+    """Create a database in a temporary directory, removed once the connection is dropped."""
+    tmp_dir = tempfile.TemporaryDirectory()
+    db_path = os.path.join(tmp_dir.name, f"{name}.db")
+    create_db(db_path)
+    conn, _ = initialize_db(db_path)
+    return tmp_dir, conn
+
+
+@register_benchmark("database/insert_market_data", DB_SIZES)
+def bench_db_insert(size):
+    # Every call inserts new rows under a symbol of its own; building them is part of the timing.
+    template = [row[:1] + row[2:] for row in fixtures.synthetic_market_rows(size)]
+    symbols = (f"SYN{n}" for n in itertools.count())
+    tmp_dir, conn = _fresh_db("insert")
+
+    def run():
+        symbol = next(symbols)
+        insert_market_data(conn, [(timestamp, symbol, *values) for timestamp, *values in template])
+    run.tmp_dir = tmp_dir  # keep the database alive as long as the benchmark
+    return run
+
+
+@register_benchmark("database/upsert_market_data", DB_SIZES)
+def bench_db_upsert(size):
+    # All rows already exist, so every call takes the ON CONFLICT ... DO UPDATE path.
+    rows = fixtures.synthetic_market_rows(size)
+    tmp_dir, conn = _fresh_db("upsert")
+    insert_market_data(conn, rows)
+
+    def run():
+        insert_market_data(conn, rows)
+    run.tmp_dir = tmp_dir
+    return run
+
+
+@register_benchmark("database/fetch_market_data", DB_SIZES)
+def bench_db_fetch(size):
+    rows = fixtures.synthetic_market_rows(size)
+    tmp_dir, conn = _fresh_db("fetch")
+    insert_market_data(conn, rows)
+
+    def run():
+        fetch_market_data(conn, rows[0][0], rows[-1][0], rows[0][1])
+    run.tmp_dir = tmp_dir
+    return run
+
+
+@register_benchmark("database/insert_remove_feature", DB_SIZES)
+def bench_db_features(size):
+    rows = fixtures.synthetic_market_rows(size)
+    tmp_dir, conn = _fresh_db("features")
+    insert_market_data(conn, rows)
+
+    def run():
+        insert_feature(conn, lambda row: {'range': row['high'] - row['low']})
+        remove_feature(conn, 'range')
+    run.tmp_dir = tmp_dir
+    return run
+
+
+def time_callable(fn, repeat):
+    """
+    Time a callable like `timeit`: the number of calls per measurement is picked so a
+    measurement takes at least 0.2s, and the per-call times of `repeat` measurements
+    are returned.
+    """
+    fn()  # warm-up
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return number, [t / number for t in timer.repeat(repeat, number)]
+
+
+def run_benchmarks(name_filter=None, sizes=None, repeat=5):
+    """
+    Run the registered benchmarks.
+
+    Args:
+        name_filter (str, optional): Only run benchmarks whose name contains this string.
+        sizes (list of int, optional): Data sizes overriding each benchmark's defaults.
+        repeat (int): Number of measurements per benchmark and size.
+
+    Returns:
+        dict: Results in the format described in the module docstring.
+    """
+    results, errors = {}, {}
+    for name, (factory, default_sizes) in benchmark_registry.items():
+        if name_filter and name_filter not in name:
+            continue
+        for size in sizes or default_sizes:
+            try:
+                number, times = time_callable(factory(size), repeat)
+            except Exception as e:
+                errors.setdefault(name, {})[str(size)] = f"{type(e).__name__}: {e}"
+                print(f"{name:55} {size:>8}  ERROR {type(e).__name__}: {e}")
+                continue
+            median = statistics.median(times)
+            results.setdefault(name, {})[str(size)] = {
+                'min': min(times),
+                'median': median,
+                'per_item': median / size,
+                'calls': number,
+            }
+            print(f"{name:55} {size:>8}  median {median * 1e3:10.3f} ms  per item {median / size * 1e6:10.3f} us")
+
+    return {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': results,
+        'errors': errors,
+    }
+
+
+def compare_results(current, baseline, threshold):
+    """
+    Compare two result sets on the median time.
+
+    Returns:
+        list of tuple: (name, size, baseline_median, current_median) for every benchmark
+                       that is more than `threshold` (e.g. 0.2 for 20%) slower than baseline.
+    """
+    regressions = []
+    for name, by_size in current['results'].items():
+        for size, stats in by_size.items():
+            base = baseline.get('results', {}).get(name, {}).get(size)
+            if base is None:
+                continue
+            if stats['median'] > base['median'] * (1 + threshold):
+                regressions.append((name, size, base['median'], stats['median']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulator's hot paths.")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--sizes", help="comma separated data sizes overriding the defaults")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per benchmark and size")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results stored in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else None
+    current = run_benchmarks(args.filter, sizes, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    exit_code = 1 if current['errors'] else 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(current, baseline, args.threshold)
+        for name, size, before, after in regressions:
+            print(f"REGRESSION {name} [{size}]: {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms ({after / before - 1:+.0%})")
+        if regressions:
+            exit_code = 1
+        else:
+            print(f"No regressions beyond {args.threshold:.0%}.")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Puts the repository root on sys.path, so tests next to their modules can import them."""
@@ -0,0 +1,215 @@
+"""
+Concurrent market data acquisition for a whole universe of tickers.
+
+Downloads run in a thread pool driven by asyncio, so a refresh of hundreds of
+symbols takes roughly as long as the slowest symbol rather than the sum of all.
+The layer provides:
+
+- bounded parallelism (`max_concurrency` downloads in flight),
+- retries with exponential backoff and jitter,
+- optional rate limiting (`rate_limit` requests per second),
+- bulk writes of each finished symbol into the `market_data` table.
+
+Data comes from a provider: any callable `provider(symbol, period)` returning a
+DataFrame with Open/High/Low/Close/Volume columns and a DatetimeIndex, like
+`yf.download`. `yfinance_provider` is the default; `csv_http_provider` reads CSV
+from an HTTP endpoint (e.g. a local stand-in server), and tests can pass any fake.
+
+Usage:
+    errors = refresh_market_data(["AAPL", "MSFT", "^GSPC"], period="5y")
+
+    frames, errors = asyncio.run(fetch_universe(symbols, "1y", provider=my_fake_provider))
+"""
+import asyncio
+import io
+import random
+import sqlite3
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yfinance as yf
+
+from database.api import close_conn, create_db, initialize_db, insert_market_data
+from instrumentation import span
+
+
+def yfinance_provider(symbol, period):
+    """
+    Download one symbol from Yahoo Finance.
+
+    Uses `Ticker.history` rather than `yf.download`, which keeps module level state
+    and is not safe to call from several threads at once.
+    """
+    return yf.Ticker(symbol).history(period=period)
+
+
+def csv_http_provider(url_template, timeout=10):
+    """
+    Build a provider that reads CSV from an HTTP endpoint.
+
+    Args:
+        url_template (str): URL with `{symbol}` and `{period}` placeholders,
+                            e.g. "http://127.0.0.1:8000/{symbol}.csv?period={period}".
+                            The CSV needs a date column first, then Open/High/Low/Close/Volume.
+        timeout (float): Timeout per request in seconds.
+    """
+    def provider(symbol, period):
+        url = url_template.format(symbol=urllib.parse.quote(symbol), period=urllib.parse.quote(period))
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return pd.read_csv(io.BytesIO(response.read()), index_col=0, parse_dates=True)
+    return provider
+
+
+class RateLimiter:
+    """Spaces out requests so that at most `calls_per_second` start per second."""
+
+    def __init__(self, calls_per_second):
+        self.interval = 1 / calls_per_second
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def frame_to_rows(symbol, frame):
+    """
+    Convert a provider DataFrame into rows for `database.api.insert_market_data`.
+
+    Daily data gets "YYYY-MM-DD" timestamps and intraday data "YYYY-MM-DD HH:MM:SS".
+    """
+    if isinstance(frame.columns, pd.MultiIndex):
+        # yfinance returns (field, ticker) columns even for a single ticker
+        frame = frame.droplevel(1, axis=1)
+    index = pd.DatetimeIndex(frame.index)
+    daily = (index == index.normalize()).all()
+    timestamps = index.strftime("%Y-%m-%d" if daily else "%Y-%m-%d %H:%M:%S")
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [
+        (timestamp, symbol, open_, high, low, close, None if volume is None else int(volume))
+        for timestamp, open_, high, low, close, volume in zip(
+            timestamps, frame['Open'], frame['High'], frame['Low'], frame['Close'], frame['Volume']
+        )
+    ]
+
+
+async def _fetch_symbol(symbol, period, provider, executor, semaphore, limiter, retries, backoff):
+    """Fetch one symbol with retries; returns (symbol, frame, None) or (symbol, None, last error)."""
+    loop = asyncio.get_running_loop()
+    for attempt in range(retries + 1):
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                frame = await loop.run_in_executor(executor, provider, symbol, period)
+                if frame is None or frame.empty:
+                    raise ValueError(f"No data returned for {symbol}")
+                return symbol, frame, None
+            except Exception as e:
+                error = e
+        if attempt < retries:
+            # Sleep outside the semaphore so other symbols can use the slot meanwhile.
+            await asyncio.sleep(backoff * 2 ** attempt * (1 + random.random()))
+    return symbol, None, error
+
+
+async def fetch_universe(symbols, period, provider=None, max_concurrency=32, retries=3,
+                         backoff=0.5, rate_limit=None, on_result=None):
+    """
+    Fetch market data for many symbols concurrently.
+
+    Args:
+        symbols (list of str): Tickers to fetch.
+        period (str): Period passed to the provider, e.g. "1y".
+        provider (callable, optional): `provider(symbol, period) -> DataFrame`.
+                                       Defaults to `yfinance_provider`.
+        max_concurrency (int): Maximum number of downloads in flight.
+        retries (int): Retries per symbol after the first failed attempt.
+        backoff (float): Base delay in seconds; attempt n waits backoff * 2**n * (1..2).
+        rate_limit (float, optional): Maximum number of requests started per second.
+        on_result (callable, optional): Called as `on_result(symbol, frame)` in the event
+                                        loop thread as soon as a symbol is done.
+
+    Returns:
+        tuple: (dict symbol -> DataFrame, dict symbol -> exception) for successes and failures.
+    """
+    provider = provider or yfinance_provider
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+    frames, errors = {}, {}
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        tasks = [
+            _fetch_symbol(symbol, period, provider, executor, semaphore, limiter, retries, backoff)
+            for symbol in dict.fromkeys(symbols)
+        ]
+        for next_done in asyncio.as_completed(tasks):
+            symbol, frame, error = await next_done
+            if error is not None:
+                errors[symbol] = error
+                continue
+            frames[symbol] = frame
+            if on_result is not None:
+                on_result(symbol, frame)
+    return frames, errors
+
+
+def refresh_market_data(symbols, period="1y", db_path="data.db", provider=None, **fetch_options):
+    """
+    Fetch a universe of symbols concurrently and write them into `market_data`.
+
+    Every symbol is written with one bulk insert as soon as its download finishes,
+    while the remaining downloads keep running. A symbol whose frame cannot be
+    converted or inserted is reported like a failed download. Everything is committed
+    once at the end; on any other error nothing is committed.
+
+    Args:
+        symbols (list of str): Tickers to refresh.
+        period (str): Period passed to the provider, e.g. "1y".
+        db_path (str): SQLite database file; tables are created if missing.
+        provider (callable, optional): See `fetch_universe`.
+        **fetch_options: max_concurrency, retries, backoff, rate_limit (see `fetch_universe`).
+
+    Returns:
+        dict: symbol -> exception for every symbol that could not be fetched or stored.
+    """
+    create_db(db_path)
+    conn, _ = initialize_db(db_path)
+    store_errors = {}
+
+    def store(symbol, frame):
+        try:
+            rows = frame_to_rows(symbol, frame)
+        except Exception as e:
+            store_errors[symbol] = e
+            return
+        # A savepoint per symbol inside the one transaction of the refresh, so a failed
+        # insert leaves no partial rows of that symbol.
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute("SAVEPOINT store_symbol")
+        try:
+            insert_market_data(conn, rows, commit=False)
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK TO store_symbol")
+            store_errors[symbol] = e
+        finally:
+            conn.execute("RELEASE store_symbol")
+
+    try:
+        with span("download", symbols=len(symbols), period=period):
+            _, errors = asyncio.run(fetch_universe(symbols, period, provider, on_result=store, **fetch_options))
+    except BaseException:
+        conn.rollback()
+        conn.close()
+        raise
+    close_conn(conn)
+    errors.update(store_errors)
+    return errors
@@ -1,8 +1,8 @@
 import sqlite3
 import json
 
-def create_db():
-    conn, cursor = initialize_db()
+def create_db(db_path="data.db"):
+    conn, cursor = initialize_db(db_path)
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS market_data (
         timestamp TEXT,
@@ -46,8 +46,8 @@ def create_db():
     close_conn(conn)
 
 
-def initialize_db():
-    conn = sqlite3.connect("data.db")
+def initialize_db(db_path="data.db"):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     return conn, cursor
 
@@ -55,6 +55,27 @@ def close_conn(conn):
     conn.commit()
     conn.close()
 
+def insert_market_data(conn, rows, commit=True):
+    """
+    Bulk insert OHLCV rows into market_data.
+    Each row is (timestamp, symbol, open, high, low, close, volume). Existing rows
+    for the same timestamp and symbol are updated, keeping their features.
+    Pass commit=False to batch several inserts into one transaction.
+    """
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO market_data (timestamp, symbol, open, high, low, close, volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(timestamp, symbol) DO UPDATE SET
+            open = excluded.open,
+            high = excluded.high,
+            low = excluded.low,
+            close = excluded.close,
+            volume = excluded.volume
+    """, rows)
+    if commit:
+        conn.commit()
+
 def fetch_market_data(conn, start_timestamp, end_timestamp, ticker):
     cursor = conn.cursor()
 
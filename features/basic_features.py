@@ -1,5 +1,29 @@
+import numpy as np
 import pandas as pd
 
+from features.rolling import rolling_features
+
+def _pandas_rolling(close, statistic, window):
+    """Reference pandas version of one rolling statistic, used for non-finite input."""
+    rolling = close.rolling(window=window)
+    if statistic == "zscore":
+        return ((close - rolling.mean()) / rolling.std()).fillna(0)
+    return getattr(rolling, statistic)().fillna(0)
+
+def _rolling(df, requests):
+    """Run the fused rolling kernel on df['Close'] and wrap each result like the input column."""
+    close = df['Close']
+    values = np.asarray(close, dtype=np.float64)
+    if not np.isfinite(values).all():
+        # The kernel needs finite values; pandas skips windows with gaps (NaN, then 0).
+        return [_pandas_rolling(close, statistic, window) for statistic, window in requests]
+    if values.ndim == 2:
+        # Multi-column 'Close' (e.g. yfinance MultiIndex columns): one row per column.
+        results = rolling_features(values.T, requests)
+        return [pd.DataFrame(result.T, index=close.index, columns=close.columns) for result in results]
+    results = rolling_features(values, requests)
+    return [pd.Series(result, index=close.index, name=close.name) for result in results]
+
 def feature_pct_return(df):
     return df['Close'].pct_change().fillna(0)
 
@@ -7,13 +31,13 @@ def feature_lag(df, n=1):
     return df['Close'].shift(n).fillna(0)
 
 def feature_sma(df, n=10):
-    return df['Close'].rolling(window=n).mean().fillna(0)
+    return _rolling(df, [("mean", n)])[0]
 
 def feature_standard_deviation(df, n=20):
-    return df['Close'].rolling(window=n).std().fillna(0)
+    return _rolling(df, [("std", n)])[0]
 
 def feature_variance(df, n=20):
-    return df['Close'].rolling(window=n).var().fillna(0)
+    return _rolling(df, [("var", n)])[0]
 
 def feature_ema(df, span=None, halflife=None):
     return df['Close'].ewm(span=span, halflife=halflife).mean().fillna(0)
@@ -22,10 +46,7 @@ def feature_log_return(df):
     return np.log(df['Close'] / df['Close'].shift(1)).fillna(0)
 
 def feature_zscore(df, n=20):
-    rolling_mean = df['Close'].rolling(window=n).mean()
-    rolling_std = df['Close'].rolling(window=n).std()
-    zscore = (df['Close'] - rolling_mean) / rolling_std
-    return zscore.fillna(0)
+    return _rolling(df, [("zscore", n)])[0]
 
 def feature_rate_of_change(df, n=10):
     prev = df['Close'].shift(n)
@@ -33,14 +54,13 @@ def feature_rate_of_change(df, n=10):
     return roc.fillna(0)
 
 def feature_rolling_max(df, n=20):
-    return df['Close'].rolling(window=n).max().fillna(0)
+    return _rolling(df, [("max", n)])[0]
 
 def feature_rolling_min(df, n=20):
-    return df['Close'].rolling(window=n).min().fillna(0)
+    return _rolling(df, [("min", n)])[0]
 
 def feature_donchian_channels(df, n=20):
-    upper = feature_rolling_max(df, n)
-    lower = feature_rolling_min(df, n)
+    upper, lower = _rolling(df, [("max", n), ("min", n)])
     middle = (upper + lower) / 2
     return pd.DataFrame({
         'donchian_upper': upper,
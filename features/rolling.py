@@ -0,0 +1,187 @@
+"""
+Batched rolling-window statistics over one or many price series.
+
+`rolling_features` computes any set of (statistic, window) pairs in one call on a
+contiguous float64 array of shape (T,) or (paths, T):
+
+- mean, var, std and zscore of every window length come from a single pair of
+  prefix sums (of the values and of their squares), computed once per call in
+  blocks so that every sum stays local to the windows it serves,
+- max and min use a sparse table of power-of-two windows, built once per call
+  and shared by every window length (O(log window) passes instead of O(window)),
+- results are written into one (requests, paths, T) output buffer, which can be
+  preallocated and reused across calls.
+
+Like the pandas based features, the first `window - 1` entries of every result are 0.
+Variances from prefix sums carry an absolute rounding error of roughly
+eps * sum((x - r)**2) over the at most `PREFIX_BLOCK + window` values around a
+window, with r the first of them, so the error does not grow with the length of the
+history or with an old price level far from the current one. The few windows whose
+variance is too small for that error to be negligible (relative error above
+`REFINE_PRECISION`) are recomputed directly, and exactly flat windows are exactly 0,
+so results agree with a two-pass computation to about 1e-10 relative.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+ROLLING_STATISTICS = ("mean", "var", "std", "zscore", "max", "min")
+# Minimum number of output positions sharing one set of prefix sums, and the relative
+# precision below which a window's variance is recomputed directly (see `rolling_features`).
+PREFIX_BLOCK = 128
+REFINE_PRECISION = 1e-10
+
+
+def rolling_features(values, requests, out=None):
+    """
+    Compute rolling statistics for every (statistic, window) pair in `requests`.
+
+    Args:
+        values (array-like): Finite values of shape (T,) or (paths, T).
+        requests (list of tuple): (statistic, window) pairs, where statistic is one of
+                                  'mean', 'var', 'std' (sample, like pandas), 'zscore',
+                                  'max' or 'min'.
+        out (np.ndarray, optional): Preallocated float64 buffer of shape
+                                    (len(requests), T) or (len(requests), paths, T).
+
+    Returns:
+        np.ndarray: `out`, or a new array of that shape, with result k in `out[k]`.
+    """
+    for statistic, window in requests:
+        if statistic not in ROLLING_STATISTICS:
+            raise ValueError(f"Unknown rolling statistic '{statistic}'. Choose from {ROLLING_STATISTICS}.")
+        if window < 1:
+            raise ValueError(f"Rolling window must be at least 1, got {window}.")
+
+    values = np.asarray(values, dtype=np.float64)
+    single = values.ndim == 1
+    if single:
+        values = values[None, :]
+    if values.ndim != 2:
+        raise ValueError(f"Expected values of shape (T,) or (paths, T), got {values.shape}.")
+    values = np.ascontiguousarray(values)
+    if not np.isfinite(values).all():
+        raise ValueError("rolling_features requires finite values.")
+    num_paths, length = values.shape
+
+    if out is None:
+        out = np.empty((len(requests), length) if single else (len(requests), num_paths, length))
+    target = out[:, None, :] if single else out
+    if target.shape != (len(requests), num_paths, length):
+        raise ValueError(f"Output buffer has shape {out.shape}, expected {(len(requests),) + values.shape[single:]}.")
+
+    # One set of prefix sums serves every mean/var window; `reach` covers the longest one.
+    reach = max([window for statistic, window in requests if statistic not in ("max", "min") and window <= length],
+                default=1) - 1
+    block = max(PREFIX_BLOCK, reach + 1)
+    num_blocks = -(-length // block)
+    prefix = None
+    means, moments = {}, {}
+    levels = {"max": [values], "min": [values]}
+
+    def prefix_sums():
+        nonlocal prefix
+        if prefix is None:
+            # Blocked prefix sums: the output positions are cut into blocks, and every block
+            # gets its own prefix sums over the `reach` values before it and the block itself,
+            # centered on the first of them. Rounding errors then only grow with the values
+            # near a window instead of with the whole history before it.
+            padded = np.concatenate([
+                np.repeat(values[:, :1], reach, axis=1),
+                values,
+                np.repeat(values[:, -1:], num_blocks * block - length, axis=1),
+            ], axis=1)
+            segments = sliding_window_view(padded, reach + block, axis=1)[:, ::block]
+            reference = segments[:, :, :1]
+            centered = segments - reference
+            sums = np.zeros((num_paths, num_blocks, reach + block + 1))
+            squares = np.zeros((num_paths, num_blocks, reach + block + 1))
+            np.cumsum(centered, axis=2, out=sums[:, :, 1:])
+            np.cumsum(centered * centered, axis=2, out=squares[:, :, 1:])
+            # Running count of values equal to their predecessor, to detect flat windows exactly.
+            repeats = np.zeros((num_paths, length), dtype=np.int64)
+            np.cumsum(values[:, 1:] == values[:, :-1], axis=1, out=repeats[:, 1:])
+            prefix = (reference, sums, squares, repeats)
+        return prefix
+
+    def window_sums(sums, window):
+        # Sums over the windows ending at every position of every block, as (paths, blocks, block).
+        return sums[:, :, reach + 1:] - sums[:, :, reach + 1 - window:reach + 1 - window + block]
+
+    def unblock(blocked, window):
+        # Positions of all full windows, as (paths, length - window + 1).
+        return blocked.reshape(num_paths, num_blocks * block)[:, window - 1:length]
+
+    def window_mean(window):
+        if window not in means:
+            reference, sums, _, _ = prefix_sums()
+            means[window] = unblock(window_sums(sums, window) / window + reference, window)
+        return means[window]
+
+    def window_moments(window):
+        # Mean and sample variance, with ill-conditioned windows recomputed exactly.
+        if window not in moments:
+            mean = window_mean(window)
+            if window == 1:
+                moments[window] = (mean, np.zeros((num_paths, length)))
+                return moments[window]
+            _, sums, squares, repeats = prefix_sums()
+            window_sum = window_sums(sums, window)
+            var = (window_sums(squares, window) - window_sum * window_sum / window) / (window - 1)
+            # The difference of two prefix sums is off by a few eps times the sums of the block.
+            # Where that is not negligible next to the window's own sum of squares (nearly flat
+            # windows far from the block reference), the window is recomputed in two passes.
+            ill = unblock(var * (window - 1) * REFINE_PRECISION < squares[:, :, -1:] * np.finfo(np.float64).eps,
+                          window)
+            var = unblock(var, window)
+            # Exactly flat windows are set to 0; a two-pass mean can be an ulp off as well.
+            flat = repeats[:, window - 1:] - repeats[:, :length - window + 1] == window - 1
+            ill &= ~flat
+            if ill.any():
+                path_index, position = np.nonzero(ill)
+                windows = sliding_window_view(values, window, axis=1)[path_index, position]
+                mean = mean.copy()
+                mean[ill] = windows.mean(axis=1)
+                var[ill] = windows.var(axis=1, ddof=1)
+            var[flat] = 0.0
+            moments[window] = (mean, var)
+        return moments[window]
+
+    def window_extremum(statistic, window, out):
+        # Sparse table: level k holds the extremum over the trailing 2**k values and is
+        # shared by every window length. A window of length w is covered by two
+        # overlapping windows of the largest power of two p <= w.
+        reduce = np.maximum if statistic == "max" else np.minimum
+        table = levels[statistic]
+        k = window.bit_length() - 1
+        while len(table) <= k:
+            span = 1 << (len(table) - 1)
+            previous = table[-1]
+            level = previous.copy()
+            reduce(previous[:, span:], previous[:, :-span], out=level[:, span:])
+            table.append(level)
+        p = 1 << k
+        reduce(table[k][:, window - 1:], table[k][:, p - 1:length - window + p], out=out)
+
+    for k, (statistic, window) in enumerate(requests):
+        dest = target[k]
+        if window > length:
+            dest[:] = 0.0
+            continue
+        dest[:, :window - 1] = 0.0
+        valid = dest[:, window - 1:]
+
+        if statistic in ("max", "min"):
+            window_extremum(statistic, window, valid)
+        elif statistic == "mean":
+            valid[:] = window_mean(window)
+        elif statistic == "var":
+            valid[:] = window_moments(window)[1]
+        elif statistic == "std":
+            np.sqrt(window_moments(window)[1], out=valid)
+        else:  # zscore
+            mean, var = window_moments(window)
+            std = np.sqrt(var)
+            valid[:] = 0.0
+            np.divide(values[:, window - 1:] - mean, std, out=valid, where=std > 0)
+
+    return out
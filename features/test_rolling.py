@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from features import basic_features
+from features.rolling import ROLLING_STATISTICS, rolling_features
+
+
+def pandas_rolling(values, statistic, window):
+    """Reference result: the pandas rolling statistic with leading NaNs set to 0."""
+    close = pd.Series(values)
+    rolling = close.rolling(window=window)
+    if statistic == "zscore":
+        return ((close - rolling.mean()) / rolling.std()).fillna(0).to_numpy()
+    return getattr(rolling, statistic)().fillna(0).to_numpy()
+
+
+def exact_rolling(values, statistic, window):
+    """Two-pass result computed window by window, with the leading entries set to 0."""
+    result = np.zeros(len(values))
+    if window > len(values):
+        return result
+    windows = sliding_window_view(values, window)
+    if statistic in ("mean", "max", "min"):
+        result[window - 1:] = getattr(windows, statistic)(axis=1)
+    elif window > 1:
+        std = windows.std(axis=1, ddof=1)
+        if statistic == "var":
+            result[window - 1:] = std ** 2
+        elif statistic == "std":
+            result[window - 1:] = std
+        else:
+            deviation = values[window - 1:] - windows.mean(axis=1)
+            result[window - 1:] = np.divide(deviation, std, out=np.zeros_like(std), where=std > 0)
+    return result
+
+
+def assert_matches(row, values, statistic, window):
+    # pandas updates its window sums bar by bar and loses a few digits on variances that are
+    # tiny relative to the price level, so it is compared loosely and the two-pass result tightly.
+    message = f"{statistic} {window}"
+    np.testing.assert_allclose(row, pandas_rolling(values, statistic, window), rtol=1e-4, atol=1e-9, err_msg=message)
+    np.testing.assert_allclose(row, exact_rolling(values, statistic, window), rtol=1e-9, atol=1e-12, err_msg=message)
+
+
+def prices(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, size)))
+
+
+REQUESTS = [(statistic, window) for statistic in ROLLING_STATISTICS for window in (1, 2, 5, 20, 300)]
+
+
+def test_matches_pandas_1d():
+    values = prices(1000)
+    result = rolling_features(values, REQUESTS)
+    assert result.shape == (len(REQUESTS), len(values))
+    for (statistic, window), row in zip(REQUESTS, result):
+        assert_matches(row, values, statistic, window)
+
+
+def test_matches_pandas_2d():
+    values = np.stack([prices(400, seed) for seed in range(5)])
+    result = rolling_features(values, REQUESTS)
+    assert result.shape == (len(REQUESTS),) + values.shape
+    for (statistic, window), rows in zip(REQUESTS, result):
+        for path, row in zip(values, rows):
+            assert_matches(row, path, statistic, window)
+
+
+def test_window_one():
+    values = prices(50)
+    mean, var, std, zscore, maximum, minimum = rolling_features(values, [(s, 1) for s in ROLLING_STATISTICS])
+    np.testing.assert_array_equal(mean, values)
+    np.testing.assert_array_equal(maximum, values)
+    np.testing.assert_array_equal(minimum, values)
+    # pandas returns NaN for the sample variance of one value, which becomes 0.
+    assert not var.any() and not std.any() and not zscore.any()
+
+
+def test_window_longer_than_series_is_zero():
+    values = prices(10)
+    result = rolling_features(values, [(statistic, 11) for statistic in ROLLING_STATISTICS])
+    assert not result.any()
+    for statistic in ROLLING_STATISTICS:
+        np.testing.assert_array_equal(pandas_rolling(values, statistic, 11), 0)
+
+
+def test_flat_windows_are_exactly_zero():
+    values = np.concatenate([prices(30), np.full(30, 123.45), prices(30, seed=1)])
+    var, std, zscore = rolling_features(values, [("var", 5), ("std", 5), ("zscore", 5)])
+    flat = slice(34, 60)
+    assert not var[flat].any() and not std[flat].any() and not zscore[flat].any()
+    assert_matches(var, values, "var", 5)
+
+
+def test_cent_ticks_far_below_earlier_prices():
+    # Prices falling from ~500 to ~1 in cent ticks: the variance of the last windows is
+    # tiny compared with the squared price level at the start of the history.
+    rng = np.random.default_rng(0)
+    size = 2520
+    values = np.round(np.geomspace(500, 1, size) * np.exp(rng.normal(0, 0.002, size)), 2)
+    values[-40:] = np.round(1 + rng.normal(0, 0.005, 40), 2)
+    for window in (5, 20, 50):
+        std = rolling_features(values, [("std", window)])[0]
+        np.testing.assert_allclose(std, exact_rolling(values, "std", window), rtol=1e-8, atol=1e-12)
+        np.testing.assert_allclose(std, pandas_rolling(values, "std", window), rtol=1e-4, atol=1e-12)
+
+
+def test_out_buffer_is_reused():
+    values = np.stack([prices(300, seed) for seed in range(3)])
+    requests = [("mean", 5), ("zscore", 20), ("max", 10)]
+    out = np.full((len(requests),) + values.shape, np.nan)
+    result = rolling_features(values, requests, out=out)
+    assert result is out
+    np.testing.assert_allclose(out, rolling_features(values, requests))
+
+    # A second call overwrites every entry, including the leading zeros.
+    rolling_features(values[:, ::-1], requests, out=out)
+    np.testing.assert_allclose(out, rolling_features(values[:, ::-1], requests))
+
+    single = np.empty((len(requests), 300))
+    assert rolling_features(values[0], requests, out=single) is single
+    np.testing.assert_allclose(single, rolling_features(values[0], requests))
+
+
+def test_out_buffer_shape_is_checked():
+    with pytest.raises(ValueError, match="Output buffer has shape"):
+        rolling_features(prices(100), [("mean", 5)], out=np.empty((2, 100)))
+    with pytest.raises(ValueError, match="Output buffer has shape"):
+        rolling_features(np.ones((3, 100)), [("mean", 5)], out=np.empty((1, 100)))
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError, match="Unknown rolling statistic"):
+        rolling_features(prices(10), [("median", 5)])
+    with pytest.raises(ValueError, match="at least 1"):
+        rolling_features(prices(10), [("mean", 0)])
+    with pytest.raises(ValueError, match="shape"):
+        rolling_features(np.ones((2, 2, 2)), [("mean", 1)])
+    with pytest.raises(ValueError, match="finite"):
+        rolling_features(np.array([1.0, np.nan, 2.0]), [("mean", 1)])
+
+
+@pytest.mark.parametrize("feature, statistic", [
+    (basic_features.feature_sma, "mean"),
+    (basic_features.feature_standard_deviation, "std"),
+    (basic_features.feature_variance, "var"),
+    (basic_features.feature_zscore, "zscore"),
+    (basic_features.feature_rolling_max, "max"),
+    (basic_features.feature_rolling_min, "min"),
+])
+def test_features_keep_pandas_semantics_with_nan(feature, statistic):
+    values = prices(100)
+    values[[10, 50, 51]] = np.nan
+    df = pd.DataFrame({'Close': values})
+    result = feature(df, n=5)
+    assert isinstance(result, pd.Series)
+    np.testing.assert_allclose(result.to_numpy(), pandas_rolling(values, statistic, 5), rtol=1e-9, atol=1e-9)
+    # Windows touching a NaN are 0, like the pandas version followed by fillna(0).
+    assert not result.iloc[50:56].any()
@@ -1,31 +1,115 @@
+import asyncio
+import os
+
 import yfinance as yf
 import matplotlib.pyplot as plt
 import numpy as np
 
+from dataAcquisition import fetch_universe
+from instrumentation import span
 from mathSim import plot_simulation_report, simulate_stock_paths
+from pathStore import ScaledPathSet, create_path_set, load_path_set, remove_path_set, rename_path_set, update_metadata
 
 def denormalize_data(paths, start_price):
-    return [[start_price * value for value in path[1:]] for path in paths]
+    return start_price * np.asarray(paths, dtype=np.float64)[:, 1:]
+
+def _path_set_matches(metadata, ticker, period, number_of_paths, path_length):
+    """Check that a stored path set is complete and was generated for these arguments."""
+    if 'start_price' not in metadata or 'model_params' not in metadata:
+        return False
+    expected = {'ticker': ticker, 'period': period, 'shape': [number_of_paths, path_length]}
+    mismatched = {key: metadata.get(key) for key, value in expected.items() if metadata.get(key) != value}
+    if mismatched:
+        raise ValueError(
+            f"Path set was generated with {mismatched}, which does not match the requested {expected}. "
+            "Use a different path_set_file or delete the existing one."
+        )
+    return True
+
+def _plot_stored_report(ticker, period, paths):
+    """Plot the simulation report of a reused path set; the real returns are downloaded again."""
+    data = get_real_data(ticker, period)
+    real_returns = np.log(data['Close'] / data['Close'].shift(1)).dropna()
+    plot_simulation_report(paths, np.diff(np.log(paths), axis=1).ravel(), real_returns)
+
+def get_simulated_data(ticker, period, number_of_paths, plot_sim_report=False, path_set_file=None):
+    """
+    Simulate price paths for a ticker, scaled to its latest close.
 
-def get_simulated_data(ticker, period, number_of_paths, plot_sim_report=False):
+    When `path_set_file` is given, the normalized paths are generated straight
+    into a memory-mapped path set on disk (see `pathStore`). If a complete path set
+    for the same ticker, period and number of paths already exists, it is reused
+    instead of calibrating and simulating again, and the start price recorded in its
+    metadata is used for scaling. A path set made for other arguments raises ValueError.
+    `plot_sim_report` plots reused path sets too, next to freshly downloaded real returns.
+
+    Returns:
+        Paths of shape (number_of_paths, path_length - 1): an np.ndarray, or a lazy
+        `ScaledPathSet` over the memory map when `path_set_file` is given.
+    """
     period_table = {
         "10y": 2520,
         "5y": 1260,
         "1y": 252,
     }
-    paths, sim_returns, real_returns = simulate_stock_paths(
-        ticker=ticker,
-        num_paths=number_of_paths,
-        path_length=round((2 * period_table[period]) / number_of_paths), # path_length = 2*period / number_of_paths; This gets the best results
-        period=period,
-        verbose=False
-    )
-    if plot_sim_report:
-        plot_simulation_report(paths, sim_returns, real_returns)
-    start_price = float(yf.download(ticker, period="1d", progress=False)['Close'].iloc[0])
-    data = denormalize_data(paths, start_price)
-
-    return data
+    path_length = round((2 * period_table[period]) / number_of_paths) # path_length = 2*period / number_of_paths; This gets the best results
+
+    if path_set_file is not None and os.path.exists(path_set_file):
+        paths, metadata = load_path_set(path_set_file)
+        if _path_set_matches(metadata, ticker, period, number_of_paths, path_length):
+            if plot_sim_report:
+                _plot_stored_report(ticker, period, paths)
+            return ScaledPathSet(paths, metadata['start_price'])
+        paths = None  # incomplete path set: generate it again
+
+    with span("download", ticker=ticker, period="1d"):
+        start_price = float(yf.download(ticker, period="1d", progress=False)['Close'].iloc[0])
+
+    out = None
+    if path_set_file is not None:
+        # Generate under a temporary name, so a failed run never leaves a path set behind
+        tmp_file = f"{path_set_file}.tmp.npy"
+        out = create_path_set(tmp_file, number_of_paths, path_length, {'ticker': ticker, 'period': period})
+
+    try:
+        paths, sim_returns, real_returns, model_params = simulate_stock_paths(
+            ticker=ticker,
+            num_paths=number_of_paths,
+            path_length=path_length,
+            period=period,
+            verbose=False,
+            out=out,
+            with_log_returns=plot_sim_report
+        )
+        if out is not None:
+            out.flush()
+            update_metadata(tmp_file, {'model_params': model_params, 'seed': model_params['seed'], 'start_price': start_price})
+        if plot_sim_report:
+            plot_simulation_report(paths, sim_returns, real_returns)
+    except BaseException:
+        if path_set_file is not None:
+            out = paths = None  # release the memory map before deleting it
+            remove_path_set(tmp_file)
+        raise
+
+    if path_set_file is None:
+        return denormalize_data(paths, start_price)
+
+    out = paths = None  # release the memory map before renaming it
+    rename_path_set(tmp_file, path_set_file)
+    paths, metadata = load_path_set(path_set_file)
+    return ScaledPathSet(paths, metadata['start_price'])
+
+def get_real_data_universe(tickers, period, **fetch_options):
+    """
+    Download many tickers concurrently (see `dataAcquisition.fetch_universe`).
+
+    Returns:
+        tuple: (dict ticker -> DataFrame, dict ticker -> exception for failed tickers)
+    """
+    with span("download", tickers=len(tickers), period=period):
+        return asyncio.run(fetch_universe(tickers, period, **fetch_options))
 
 def get_real_data(ticker, period):
-    return yf.download(ticker, period=period, progress=False)
\ No newline at end of file
+    with span("download", ticker=ticker, period=period):
+        return yf.download(ticker, period=period, progress=False)
@@ -0,0 +1,184 @@
+"""
+Opt-in profiling hooks for simulation runs.
+
+Tracing is disabled by default. While disabled, `span` returns a shared no-op
+context manager and `get_tracer` returns None, so instrumented code pays a single
+function call or `is None` check.
+
+When enabled, two kinds of data are recorded:
+- Timed spans around the stages of a run (download, calibrate, simulate,
+  precompute, loop, plot).
+- Per-bar samples from `run_strategy_loop`, taken every `sample_every` bars:
+  strategy call time, stop-book size and number of trades so far.
+
+The trace can be exported as JSON in the Chrome trace event format (open it in
+chrome://tracing or https://ui.perfetto.dev), with a per-stage summary attached.
+
+Usage:
+    import instrumentation
+
+    tracer = instrumentation.enable(sample_every=50)
+    ... run simulation ...
+    tracer.export("trace.json")
+    print(instrumentation.format_summary(tracer.summary()))
+
+`MAIN.py` enables tracing when the METIS_TRACE environment variable is set to
+the file the trace should be written to.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+_tracer = None
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Tracer:
+    """Collects spans and per-bar samples of a run."""
+
+    def __init__(self, sample_every=100):
+        if sample_every < 1:
+            raise ValueError(f"sample_every must be at least 1, got {sample_every}.")
+        self.sample_every = sample_every
+        self.spans = []
+        self.samples = []
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.spans.append({
+                'name': name,
+                'start': start - self._origin,
+                'duration': end - start,
+                'tid': threading.get_ident(),
+                'attrs': attrs,
+            })
+
+    def sample(self, name, bar, **values):
+        """Record counters of one sampled bar."""
+        self.samples.append({
+            'name': name,
+            'time': time.perf_counter() - self._origin,
+            'bar': bar,
+            'tid': threading.get_ident(),
+            **values,
+        })
+
+    def summary(self):
+        """
+        Aggregate spans by name and samples by counter.
+
+        Returns:
+            dict: {'spans': {name: {count, total, mean, max}},
+                   'samples': {name: {count, <counter>: {mean, max}}}}
+        """
+        spans = {}
+        for span in self.spans:
+            stats = spans.setdefault(span['name'], {'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] += span['duration']
+            stats['max'] = max(stats['max'], span['duration'])
+        for stats in spans.values():
+            stats['mean'] = stats['total'] / stats['count']
+
+        samples = {}
+        for sample in self.samples:
+            stats = samples.setdefault(sample['name'], {'count': 0})
+            stats['count'] += 1
+            for key, value in sample.items():
+                if key in ('name', 'time', 'bar', 'tid'):
+                    continue
+                counter = stats.setdefault(key, {'total': 0.0, 'max': value})
+                counter['total'] += value
+                counter['max'] = max(counter['max'], value)
+        for stats in samples.values():
+            for key, counter in stats.items():
+                if key != 'count':
+                    counter['mean'] = counter.pop('total') / stats['count']
+
+        return {'spans': spans, 'samples': samples}
+
+    def export(self, path):
+        """Write the trace in Chrome trace event format, with the summary under 'summary'."""
+        pid = os.getpid()
+        events = [
+            {
+                'name': span['name'],
+                'ph': 'X',
+                'ts': span['start'] * 1e6,
+                'dur': span['duration'] * 1e6,
+                'pid': pid,
+                'tid': span['tid'],
+                'args': span['attrs'],
+            }
+            for span in self.spans
+        ]
+        # Trace viewers plot every entry of a counter's args as a series, so the bar number is
+        # kept next to them as an extra event field (ignored by the viewers) rather than in args.
+        events.extend(
+            {
+                'name': sample['name'],
+                'ph': 'C',
+                'ts': sample['time'] * 1e6,
+                'pid': pid,
+                'tid': sample['tid'],
+                'bar': sample['bar'],
+                'args': {key: value for key, value in sample.items() if key not in ('name', 'time', 'bar', 'tid')},
+            }
+            for sample in self.samples
+        )
+        with open(path, "w") as f:
+            json.dump({'traceEvents': events, 'summary': self.summary()}, f, default=str)
+
+
+def enable(sample_every=100):
+    """
+    Start tracing in this process and return the new tracer.
+
+    Args:
+        sample_every (int): Record a per-bar sample every `sample_every` bars (at least 1).
+    """
+    global _tracer
+    _tracer = Tracer(sample_every)
+    return _tracer
+
+
+def disable():
+    """Stop tracing and return the tracer that was active, if any."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer():
+    """Return the active tracer, or None when tracing is disabled."""
+    return _tracer
+
+
+def span(name, **attrs):
+    """Time the enclosed block as a span named `name`; a no-op when tracing is disabled."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, **attrs)
+
+
+def format_summary(summary):
+    """Render the output of `Tracer.summary` as a human-readable table."""
+    lines = [f"{'Stage':30} {'Count':>7} {'Total (s)':>11} {'Mean (ms)':>11} {'Max (ms)':>11}"]
+    for name, stats in sorted(summary['spans'].items(), key=lambda item: -item[1]['total']):
+        lines.append(
+            f"{name:30} {stats['count']:>7} {stats['total']:>11.3f} {stats['mean'] * 1e3:>11.3f} {stats['max'] * 1e3:>11.3f}"
+        )
+    for name, stats in summary['samples'].items():
+        lines.append(f"\nSamples of {name} ({stats['count']} bars):")
+        for key, counter in stats.items():
+            if key != 'count':
+                lines.append(f"  {key:28} mean {counter['mean']:>12.6g}  max {counter['max']:>12.6g}")
+    return "\n".join(lines)
@@ -4,28 +4,72 @@ import numpy as np
 from scipy.stats import wasserstein_distance
 from collections import Counter
 
-def simulate_stock_paths(ticker, num_paths, path_length, period, verbose):
+from instrumentation import span
+
+def generate_sv_paths(model_params, num_paths, path_length, rng=None, out=None):
     """
-    Simulate stochastic volatility paths for a stock using best-fit parameters from grid search.
-    
+    Generate normalized (S0 = 1) stochastic volatility price paths.
+
+    All paths are advanced together one time step at a time, so the cost of a
+    step is a handful of vectorized operations regardless of `num_paths`.
+
+    Args:
+        model_params (dict): Model parameters with keys 'mu', 'v0', 'theta',
+                             'kappa', 'xi' and 'rho'.
+        num_paths (int): Number of paths to generate.
+        path_length (int): Number of time steps per path (including S0).
+        rng (np.random.Generator, optional): Random generator to draw from.
+        out (np.ndarray, optional): Preallocated (num_paths, path_length) array
+                                    to write into, e.g. a memory-mapped path set.
+
     Returns:
-        simulated_paths, simulated_log_returns, real_log_returns
+        np.ndarray: Array of shape (num_paths, path_length).
     """
-    # --- Fetch historical data ---
-    data = yf.download(ticker, period=period, progress=False)
-    if len(data) < 2 * path_length:
-        raise ValueError(f"Not enough data ({len(data)} rows) for {path_length}-day simulation. Try a longer period.")
-    data['Log_Return'] = np.log(data['Close'] / data['Close'].shift(1))
-    data = data.dropna()
-    real_log_returns = data['Log_Return']
+    if rng is None:
+        rng = np.random.default_rng()
+    if out is None:
+        out = np.empty((num_paths, path_length), dtype=np.float64)
+
+    mu, v0, theta = model_params['mu'], model_params['v0'], model_params['theta']
+    kappa, xi, rho = model_params['kappa'], model_params['xi'], model_params['rho']
+    dt = 1 / 252
+    sqrt_dt = np.sqrt(dt)
+    rho_c = np.sqrt(1 - rho**2)
+
+    S = np.ones(num_paths)
+    v = np.full(num_paths, v0, dtype=np.float64)
+    out[:, 0] = S
+    for t in range(1, path_length):
+        z1 = rng.standard_normal(num_paths)
+        z2 = rho * z1 + rho_c * rng.standard_normal(num_paths)
+        sqrt_v = np.sqrt(v)
+        S = S * np.exp((mu - 0.5 * v) * dt + sqrt_v * sqrt_dt * z1)
+        v = np.abs(v + kappa * (theta - v) * dt + xi * sqrt_v * sqrt_dt * z2)
+        out[:, t] = S
+    return out
+
+
+def calibrate_sv_model(real_log_returns, path_length, rng=None, verbose=False):
+    """
+    Fit stochastic volatility parameters to real log returns via grid search.
+
+    Args:
+        real_log_returns (pd.Series or np.ndarray): Daily log returns to fit.
+        path_length (int): Number of time steps simulated per candidate path.
+        rng (np.random.Generator, optional): Random generator to draw from.
+        verbose (bool): Print the most consistent parameter sets.
+
+    Returns:
+        dict: Model parameters with keys 'mu', 'v0', 'theta', 'kappa', 'xi', 'rho'.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    real_log_returns = np.asarray(real_log_returns, dtype=np.float64).ravel()
 
     # --- Model constants derived from real data ---
     mu = real_log_returns.mean() * 252
-    v0 = real_log_returns.var() * 252
+    v0 = real_log_returns.var(ddof=1) * 252
     theta = v0
-    S0 = 1
-    dt = 1 / 252
-    N = path_length
     num_simulations = 5  # for parameter tuning
 
     # --- Parameter grid ---
@@ -34,20 +78,9 @@ def simulate_stock_paths(ticker, num_paths, path_length, period, verbose):
     rho_vals = [-0.9, -0.8, -0.7, -0.6, -0.5, 0]
 
     def simulate_sv(kappa, xi, rho):
-        all_log_returns = []
-        for _ in range(num_simulations):
-            S = np.zeros(N)
-            v = np.zeros(N)
-            S[0] = S0
-            v[0] = v0
-            for t in range(1, N):
-                z1 = np.random.normal()
-                z2 = rho * z1 + np.sqrt(1 - rho**2) * np.random.normal()
-                v[t] = np.abs(v[t-1] + kappa * (theta - v[t-1]) * dt + xi * np.sqrt(v[t-1]) * np.sqrt(dt) * z2)
-                S[t] = S[t-1] * np.exp((mu - 0.5 * v[t-1]) * dt + np.sqrt(v[t-1]) * np.sqrt(dt) * z1)
-            log_ret = np.diff(np.log(S))
-            all_log_returns.extend(log_ret)
-        return np.array(all_log_returns)
+        params = {'mu': mu, 'v0': v0, 'theta': theta, 'kappa': kappa, 'xi': xi, 'rho': rho}
+        paths = generate_sv_paths(params, num_simulations, path_length, rng)
+        return np.diff(np.log(paths), axis=1).ravel()
 
     # --- Run parameter search ---
     num_search_runs = 5  # Number of times to repeat the parameter search
@@ -76,25 +109,59 @@ def simulate_stock_paths(ticker, num_paths, path_length, period, verbose):
         for params, count in param_counter.most_common(5):
             print(f"Params: {params}, Count: {count}")
 
-    # --- Run final simulation with best parameters ---
     kappa, xi, rho = best_params
-    simulated_paths = []
-    simulated_log_returns = []
-
-    for _ in range(num_paths):
-        S = np.zeros(N)
-        v = np.zeros(N)
-        S[0] = S0
-        v[0] = v0
-        for t in range(1, N):
-            z1 = np.random.normal()
-            z2 = rho * z1 + np.sqrt(1 - rho**2) * np.random.normal()
-            v[t] = np.abs(v[t-1] + kappa * (theta - v[t-1]) * dt + xi * np.sqrt(v[t-1]) * np.sqrt(dt) * z2)
-            S[t] = S[t-1] * np.exp((mu - 0.5 * v[t-1]) * dt + np.sqrt(v[t-1]) * np.sqrt(dt) * z1)
-        simulated_paths.append(S)
-        simulated_log_returns.extend(np.diff(np.log(S)))
-
-    return simulated_paths, simulated_log_returns, real_log_returns
+    return {
+        'mu': float(mu),
+        'v0': float(v0),
+        'theta': float(theta),
+        'kappa': kappa,
+        'xi': xi,
+        'rho': rho,
+    }
+
+
+def simulate_stock_paths(ticker, num_paths, path_length, period, verbose, seed=None, out=None,
+                         with_log_returns=True):
+    """
+    Simulate stochastic volatility paths for a stock using best-fit parameters from grid search.
+
+    Args:
+        seed (int, optional): Seed for the random generator. A fresh seed is drawn
+                              (and returned in the model params) when omitted.
+        out (np.ndarray, optional): Preallocated (num_paths, path_length) array
+                                    to write the final paths into.
+        with_log_returns (bool): Also return the flattened log returns of all paths.
+                                 They take twice the memory of float32 paths, so pass
+                                 False when `out` is a memory-mapped path set and the
+                                 returns are not needed.
+
+    Returns:
+        simulated_paths, simulated_log_returns (None without `with_log_returns`),
+        real_log_returns, model_params
+    """
+    # --- Fetch historical data ---
+    with span("download", ticker=ticker, period=period):
+        data = yf.download(ticker, period=period, progress=False)
+    if len(data) < 2 * path_length:
+        raise ValueError(f"Not enough data ({len(data)} rows) for {path_length}-day simulation. Try a longer period.")
+    data['Log_Return'] = np.log(data['Close'] / data['Close'].shift(1))
+    data = data.dropna()
+    real_log_returns = data['Log_Return']
+
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy)
+    rng = np.random.default_rng(seed)
+
+    with span("calibrate", path_length=path_length):
+        model_params = calibrate_sv_model(real_log_returns, path_length, rng, verbose)
+
+    # --- Run final simulation with best parameters ---
+    with span("simulate", num_paths=num_paths, path_length=path_length):
+        simulated_paths = generate_sv_paths(model_params, num_paths, path_length, rng, out)
+        simulated_log_returns = np.diff(np.log(simulated_paths), axis=1).ravel() if with_log_returns else None
+
+    model_params['seed'] = seed
+    return simulated_paths, simulated_log_returns, real_log_returns, model_params
 
 
 def plot_simulation_report(simulated_paths, simulated_log_returns, real_log_returns=None):
@@ -0,0 +1,216 @@
+"""
+On-disk store for simulated price path sets.
+
+A path set is a float32 `.npy` matrix of shape (num_paths, path_length) holding
+normalized paths (S0 = 1), plus a JSON sidecar (`<name>.npy.json`) with the
+model parameters, seed and start price used to generate it. The matrix is opened
+as a memory map, so a large path set can be generated once and then shared by
+many strategies and processes without copying it into each of them.
+
+Typical use:
+
+    paths = create_path_set("paths.npy", 10000, 504, metadata)
+    generate_sv_paths(model_params, 10000, 504, rng, out=paths)
+    paths.flush()
+
+    # In any worker process:
+    paths, metadata = load_path_set("paths.npy", rows=slice(0, 500))
+    for path in iter_scaled_paths(paths, metadata['start_price']):
+        ...
+"""
+import json
+import os
+
+import numpy as np
+
+PATH_DTYPE = np.float32
+
+
+def _metadata_file(filename):
+    return f"{filename}.json"
+
+
+def _write_metadata(filename, shape, metadata):
+    sidecar = dict(metadata)
+    sidecar['shape'] = list(shape)
+    sidecar['dtype'] = np.dtype(PATH_DTYPE).name
+    with open(_metadata_file(filename), "w") as f:
+        json.dump(sidecar, f, indent=2)
+
+
+def read_metadata(filename):
+    """
+    Read the metadata sidecar of a path set.
+
+    Args:
+        filename (str): Path of the `.npy` matrix.
+
+    Returns:
+        dict: Model params, seed, start price, shape and dtype of the path set.
+    """
+    with open(_metadata_file(filename)) as f:
+        return json.load(f)
+
+
+def update_metadata(filename, metadata):
+    """
+    Merge new fields into the metadata sidecar of a path set.
+
+    Useful when the path set is allocated before the model is calibrated and
+    the params and seed are only known once generation is done.
+
+    Args:
+        filename (str): Path of the `.npy` matrix.
+        metadata (dict): JSON-serializable fields to add or overwrite.
+    """
+    sidecar = read_metadata(filename)
+    sidecar.update(metadata)
+    with open(_metadata_file(filename), "w") as f:
+        json.dump(sidecar, f, indent=2)
+
+
+def create_path_set(filename, num_paths, path_length, metadata):
+    """
+    Allocate an empty memory-mapped path set on disk and write its sidecar.
+
+    Generators can write into the returned array directly (e.g. the `out`
+    argument of `generate_sv_paths`), so the full set never has to fit in memory.
+
+    Args:
+        filename (str): Path of the `.npy` matrix to create.
+        num_paths (int): Number of paths (rows).
+        path_length (int): Number of time steps per path (columns).
+        metadata (dict): JSON-serializable model params, seed, start price, ...
+
+    Returns:
+        np.memmap: Writable (num_paths, path_length) float32 array.
+    """
+    paths = np.lib.format.open_memmap(filename, mode="w+", dtype=PATH_DTYPE, shape=(num_paths, path_length))
+    _write_metadata(filename, paths.shape, metadata)
+    return paths
+
+
+def rename_path_set(src, dst):
+    """
+    Move a path set and its sidecar to a new name, replacing any existing one.
+
+    The sidecar is moved first, so a matrix found under `dst` always has a complete sidecar.
+    """
+    os.replace(_metadata_file(src), _metadata_file(dst))
+    os.replace(src, dst)
+
+
+def remove_path_set(filename):
+    """Delete a path set and its sidecar if they exist."""
+    for path in (filename, _metadata_file(filename)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def save_path_set(filename, paths, metadata):
+    """
+    Write an in-memory set of normalized paths to disk.
+
+    Args:
+        filename (str): Path of the `.npy` matrix to create.
+        paths (array-like): Paths of shape (num_paths, path_length).
+        metadata (dict): JSON-serializable model params, seed, start price, ...
+    """
+    paths = np.asarray(paths)
+    stored = create_path_set(filename, paths.shape[0], paths.shape[1], metadata)
+    stored[:] = paths
+    stored.flush()
+
+
+def load_path_set(filename, rows=None, mode="r"):
+    """
+    Memory-map a path set, optionally restricted to a slice of its paths.
+
+    Slicing a memory map with a basic slice returns a view, so workers that each
+    take their own `rows` share the same pages of the file instead of copying them.
+
+    Args:
+        filename (str): Path of the `.npy` matrix.
+        rows (slice, optional): Paths to map. Defaults to all paths.
+        mode (str): Memory map mode, "r" (read-only), "r+" (read/write) or "c" (copy-on-write).
+
+    Returns:
+        tuple: (np.memmap of shape (rows, path_length), metadata dict)
+    """
+    paths = np.load(filename, mmap_mode=mode)
+    if rows is not None:
+        paths = paths[rows]
+    return paths, read_metadata(filename)
+
+
+def scale_path_set(paths, start_price, out=None):
+    """
+    Scale normalized paths to a start price.
+
+    Pass `out=paths` with a writable array (e.g. a path set loaded with mode "r+"
+    or "c") to scale in place without allocating a second matrix.
+
+    Args:
+        paths (np.ndarray): Normalized paths of shape (num_paths, path_length).
+        start_price (float): Price that S0 = 1 should map to.
+        out (np.ndarray, optional): Array to write the scaled paths into.
+
+    Returns:
+        np.ndarray: Scaled paths.
+    """
+    return np.multiply(paths, start_price, out=out)
+
+
+def iter_scaled_paths(paths, start_price, skip_first=True):
+    """
+    Yield paths scaled to a start price one at a time as float64 arrays.
+
+    Only one scaled path is held in memory at a time, which keeps backtesting a
+    large memory-mapped path set bounded in memory.
+
+    Args:
+        paths (np.ndarray): Normalized paths of shape (num_paths, path_length).
+        start_price (float): Price that S0 = 1 should map to.
+        skip_first (bool): Drop the S0 column, matching `denormalize_data`.
+
+    Yields:
+        np.ndarray: One scaled path.
+    """
+    first = 1 if skip_first else 0
+    for path in paths:
+        yield np.multiply(path[first:], start_price, dtype=np.float64)
+
+
+class ScaledPathSet:
+    """
+    Lazy view of normalized paths scaled to a start price.
+
+    Nothing is scaled up front: indexing or iterating scales one path at a time,
+    so a memory-mapped path set stays on disk instead of being copied into RAM.
+
+    Args:
+        paths (np.ndarray): Normalized paths of shape (num_paths, path_length).
+        start_price (float): Price that S0 = 1 should map to.
+        skip_first (bool): Drop the S0 column, matching `denormalize_data`.
+    """
+
+    def __init__(self, paths, start_price, skip_first=True):
+        self.paths = paths
+        self.start_price = start_price
+        self.skip_first = skip_first
+
+    @property
+    def shape(self):
+        num_paths, path_length = self.paths.shape
+        return num_paths, path_length - (1 if self.skip_first else 0)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        # Drop S0 before indexing, so indices refer to the columns reported by `shape`.
+        first = 1 if self.skip_first else 0
+        return np.multiply(self.paths[:, first:][index], self.start_price, dtype=np.float64)
+
+    def __iter__(self):
+        return iter_scaled_paths(self.paths, self.start_price, self.skip_first)
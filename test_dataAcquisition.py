@@ -0,0 +1,261 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataAcquisition
+from dataAcquisition import csv_http_provider, fetch_universe, frame_to_rows, refresh_market_data
+from database.api import insert_market_data
+
+
+def make_frame(size=5, price=100.0, volume=None):
+    """Daily OHLCV frame like the providers return."""
+    close = price + np.arange(size, dtype=float)
+    return pd.DataFrame({
+        'Open': close - 0.5,
+        'High': close + 1.0,
+        'Low': close - 1.0,
+        'Close': close,
+        'Volume': np.arange(1000, 1000 + size, dtype=float) if volume is None else volume,
+    }, index=pd.bdate_range("2024-01-01", periods=size))
+
+
+class FakeProvider:
+    """Provider that counts calls and fails for some symbols."""
+
+    def __init__(self, failures=None, empty=(), frames=None):
+        self.failures = dict(failures or {})
+        self.empty = set(empty)
+        self.frames = frames or {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol, period):
+        with self._lock:
+            self.calls[symbol] = self.calls.get(symbol, 0) + 1
+            attempt = self.calls[symbol]
+        if attempt <= self.failures.get(symbol, 0):
+            raise ConnectionError(f"{symbol} attempt {attempt} failed")
+        if symbol in self.empty:
+            return pd.DataFrame()
+        return self.frames.get(symbol, make_frame())
+
+
+def fetch(symbols, provider, **options):
+    return asyncio.run(fetch_universe(symbols, "1y", provider, backoff=0, **options))
+
+
+def test_flaky_symbol_is_retried():
+    provider = FakeProvider(failures={'FLAKY': 2})
+    frames, errors = fetch(["AAA", "FLAKY"], provider, retries=3)
+    assert set(frames) == {"AAA", "FLAKY"} and not errors
+    assert provider.calls == {'AAA': 1, 'FLAKY': 3}
+
+
+def test_symbol_failing_every_retry_is_reported():
+    provider = FakeProvider(failures={'BROKEN': 10})
+    frames, errors = fetch(["AAA", "BROKEN"], provider, retries=2)
+    assert set(frames) == {"AAA"}
+    assert isinstance(errors['BROKEN'], ConnectionError)
+    assert provider.calls['BROKEN'] == 3
+
+
+def test_empty_frame_is_reported_as_error():
+    provider = FakeProvider(empty={'EMPTY'})
+    frames, errors = fetch(["AAA", "EMPTY"], provider, retries=1)
+    assert set(frames) == {"AAA"}
+    assert isinstance(errors['EMPTY'], ValueError)
+    assert provider.calls['EMPTY'] == 2
+
+
+def test_duplicate_symbols_are_fetched_once():
+    provider = FakeProvider()
+    results = []
+    frames, errors = fetch(["AAA", "BBB", "AAA", "BBB", "AAA"], provider,
+                           on_result=lambda symbol, frame: results.append(symbol))
+    assert set(frames) == {"AAA", "BBB"} and not errors
+    assert provider.calls == {'AAA': 1, 'BBB': 1}
+    assert sorted(results) == ["AAA", "BBB"]
+
+
+class SleepingProvider:
+    """Provider that sleeps per symbol and records call start times and the peak number in flight."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.starts = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol, period):
+        with self._lock:
+            self.starts.append(time.perf_counter())
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delays[symbol])
+        with self._lock:
+            self.in_flight -= 1
+        return make_frame()
+
+
+def test_concurrency_is_bounded():
+    provider = SleepingProvider({f"S{i}": 0.05 for i in range(12)})
+    frames, errors = fetch(list(provider.delays), provider, max_concurrency=3)
+    assert len(frames) == 12 and not errors
+    assert provider.peak == 3
+
+
+def test_wall_time_follows_the_slowest_symbol():
+    delays = {f"S{i}": 0.1 for i in range(10)}
+    delays['SLOW'] = 0.3
+    provider = SleepingProvider(delays)
+    start = time.perf_counter()
+    frames, errors = fetch(list(delays), provider)
+    elapsed = time.perf_counter() - start
+    assert len(frames) == 11 and not errors
+    # Sequential downloads would take 1.3s.
+    assert 0.3 <= elapsed < 0.6
+
+
+def test_rate_limit_spaces_out_calls():
+    rate_limit = 20
+    provider = SleepingProvider({f"S{i}": 0.0 for i in range(6)})
+    frames, errors = fetch(list(provider.delays), provider, rate_limit=rate_limit)
+    assert len(frames) == 6 and not errors
+    gaps = np.diff(sorted(provider.starts))
+    # A little slack for the delay between the limiter releasing a call and its thread starting.
+    assert gaps.min() >= 1 / rate_limit - 0.005
+
+
+@pytest.fixture
+def csv_server():
+    """HTTP server on 127.0.0.1 serving `make_frame` as CSV under /<symbol>.csv."""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            requests.append((urllib.parse.unquote(url.path), urllib.parse.parse_qs(url.query)))
+            if not url.path.endswith(".csv") or "MISSING" in url.path:
+                self.send_error(404)
+                return
+            body = make_frame().to_csv().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/{{symbol}}.csv?period={{period}}", requests
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_csv_http_provider(csv_server):
+    url_template, requests = csv_server
+    provider = csv_http_provider(url_template, timeout=5)
+    frames, errors = fetch(["^GSPC", "MISSING"], provider, retries=0)
+
+    assert set(frames) == {"^GSPC"}
+    pd.testing.assert_frame_equal(frames["^GSPC"], make_frame(), check_freq=False, check_names=False)
+    assert isinstance(errors['MISSING'], urllib.error.HTTPError)
+    assert ("/^GSPC.csv", {'period': ["1y"]}) in requests
+
+
+def test_frame_to_rows():
+    frame = make_frame(2, volume=[np.nan, 5.0])
+    rows = frame_to_rows("AAA", frame)
+    assert rows == [
+        ("2024-01-01", "AAA", 99.5, 101.0, 99.0, 100.0, None),
+        ("2024-01-02", "AAA", 100.5, 102.0, 100.0, 101.0, 5),
+    ]
+
+
+def read_market_data(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT timestamp, symbol, close, volume, features FROM market_data ORDER BY symbol, timestamp"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_refresh_market_data(tmp_path):
+    db_path = str(tmp_path / "data.db")
+    volume = np.array([np.nan, 2000.0, 3000.0])
+    provider = FakeProvider(empty={'EMPTY'}, frames={'AAA': make_frame(3, volume=volume), 'BBB': make_frame(3, 50.0)})
+
+    errors = refresh_market_data(["AAA", "BBB", "EMPTY"], "1y", db_path, provider, retries=0, backoff=0)
+    assert set(errors) == {"EMPTY"}
+    rows = read_market_data(db_path)
+    assert len(rows) == 6
+    assert rows[0] == ("2024-01-01", "AAA", 100.0, None, None)
+    assert [row[3] for row in rows[1:3]] == [2000, 3000]
+
+    # A second refresh updates existing rows in place and keeps their features.
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE market_data SET features = '{\"range\": 2.0}' WHERE symbol = 'AAA'")
+    conn.commit()
+    conn.close()
+    provider.frames['AAA'] = make_frame(4, price=200.0)
+
+    errors = refresh_market_data(["AAA"], "1y", db_path, provider, retries=0, backoff=0)
+    assert not errors
+    rows = [row for row in read_market_data(db_path) if row[1] == "AAA"]
+    assert [row[2] for row in rows] == [200.0, 201.0, 202.0, 203.0]
+    assert rows[0][3] == 1000
+    assert [row[4] for row in rows] == ['{"range": 2.0}'] * 3 + [None]
+    assert len(read_market_data(db_path)) == 7
+
+
+def test_refresh_reports_symbols_that_cannot_be_stored(tmp_path):
+    db_path = str(tmp_path / "data.db")
+    unbindable = make_frame(3).astype(object)
+    unbindable.iloc[2, 0] = object()
+    frames = {f"S{i}": make_frame(3) for i in range(20)}
+    frames['NOVOLUME'] = make_frame(3).drop(columns='Volume')
+    frames['UNBINDABLE'] = unbindable
+    provider = FakeProvider(frames=frames)
+
+    errors = refresh_market_data(list(frames), "1y", db_path, provider, retries=0, backoff=0)
+
+    assert set(errors) == {"NOVOLUME", "UNBINDABLE"}
+    assert isinstance(errors['NOVOLUME'], KeyError)
+    assert isinstance(errors['UNBINDABLE'], sqlite3.Error)
+    rows = read_market_data(db_path)
+    assert {row[1] for row in rows} == {f"S{i}" for i in range(20)}
+    assert len(rows) == 60
+
+
+def test_refresh_rolls_back_on_unexpected_error(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "data.db")
+    inserted = []
+
+    def failing_insert(conn, rows, commit=True):
+        if len(inserted) == 5:
+            raise RuntimeError("disk on fire")
+        inserted.append(rows[0][1])
+        insert_market_data(conn, rows, commit)
+
+    monkeypatch.setattr(dataAcquisition, "insert_market_data", failing_insert)
+    with pytest.raises(RuntimeError, match="disk on fire"):
+        refresh_market_data([f"S{i}" for i in range(20)], "1y", db_path, FakeProvider(), retries=0, backoff=0)
+    assert len(inserted) == 5
+    assert read_market_data(db_path) == []
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import instrumentation
+import strategies.three_ema_crossover  # noqa: F401 (registers the strategy)
+from backtest import run_strategy_loop
+from benchmarks.fixtures import synthetic_ohlcv
+from indicators.ema_crossover import indicator_three_ema_crossover
+from strategies.base import Strategy
+
+
+@pytest.fixture
+def tracer():
+    tracer = instrumentation.enable(sample_every=10)
+    yield tracer
+    instrumentation.disable()
+
+
+def test_span_is_a_no_op_when_disabled():
+    assert instrumentation.get_tracer() is None
+    first, second = instrumentation.span("a"), instrumentation.span("b", bars=3)
+    assert first is second
+    with first:
+        pass
+
+
+@pytest.mark.parametrize("sample_every", [0, -1])
+def test_sample_every_must_be_positive(sample_every):
+    with pytest.raises(ValueError, match="sample_every"):
+        instrumentation.Tracer(sample_every)
+    with pytest.raises(ValueError, match="sample_every"):
+        instrumentation.enable(sample_every)
+    assert instrumentation.get_tracer() is None
+
+
+def test_enable_and_disable(tracer):
+    assert instrumentation.get_tracer() is tracer
+    assert instrumentation.disable() is tracer
+    assert instrumentation.get_tracer() is None
+
+
+def test_run_strategy_loop_is_traced(tracer, tmp_path):
+    data = synthetic_ohlcv(95)
+    result = run_strategy_loop(data, Strategy.registry["three_ema_crossover"], 10000, 0.01, 0.02,
+                               [indicator_three_ema_crossover])
+    assert len(result['wealth']) == 95
+
+    assert [span['name'] for span in tracer.spans] == ["precompute", "loop"]
+    assert tracer.spans[1]['attrs'] == {'bars': 95}
+    assert [sample['bar'] for sample in tracer.samples] == list(range(0, 95, 10))
+
+    summary = tracer.summary()
+    assert summary['spans']['loop']['count'] == 1
+    assert summary['spans']['loop']['total'] >= summary['spans']['loop']['max'] > 0
+    samples = summary['samples']['run_strategy_loop']
+    assert samples['count'] == 10
+    assert set(samples) == {'count', 'strategy_time', 'stop_book', 'trades'}
+    assert samples['trades']['max'] == tracer.samples[-1]['trades']
+    assert "run_strategy_loop" in instrumentation.format_summary(summary)
+
+    path = tmp_path / "trace.json"
+    tracer.export(path)
+    trace = json.loads(path.read_text())
+    spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    counters = [event for event in trace['traceEvents'] if event['ph'] == 'C']
+    assert [event['name'] for event in spans] == ["precompute", "loop"]
+    assert len(counters) == 10
+    assert [event['bar'] for event in counters] == list(range(0, 95, 10))
+    assert all(set(event['args']) == {'strategy_time', 'stop_book', 'trades'} for event in counters)
+    assert trace['summary']['samples']['run_strategy_loop']['count'] == 10
+
+
+def test_sampling_every_bar(tracer):
+    tracer = instrumentation.enable(sample_every=1)
+    run_strategy_loop(synthetic_ohlcv(20), Strategy.registry["three_ema_crossover"], 10000, 0.01, 0.02,
+                      [indicator_three_ema_crossover])
+    assert len(tracer.samples) == 20
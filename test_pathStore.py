@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pytest
+import yfinance as yf
+
+import getData
+from benchmarks import fixtures
+from getData import denormalize_data, get_simulated_data
+from pathStore import (
+    ScaledPathSet,
+    create_path_set,
+    iter_scaled_paths,
+    load_path_set,
+    read_metadata,
+    save_path_set,
+    scale_path_set,
+    update_metadata,
+)
+
+METADATA = {'ticker': "AAA", 'period': "1y", 'start_price': 50.0, 'model_params': {'mu': 0.05}, 'seed': 1}
+
+
+def normalized_paths(num_paths=6, path_length=10):
+    rng = np.random.default_rng(0)
+    paths = np.exp(np.cumsum(rng.normal(0, 0.01, (num_paths, path_length)), axis=1))
+    paths[:, 0] = 1.0
+    return paths.astype(np.float32)
+
+
+def test_create_and_load_round_trip(tmp_path):
+    filename = str(tmp_path / "paths.npy")
+    expected = normalized_paths()
+    paths = create_path_set(filename, *expected.shape, {'ticker': "AAA"})
+    paths[:] = expected
+    paths.flush()
+    update_metadata(filename, {'seed': 1})
+    del paths
+
+    loaded, metadata = load_path_set(filename)
+    assert isinstance(loaded, np.memmap) and loaded.dtype == np.float32
+    np.testing.assert_array_equal(loaded, expected)
+    assert metadata == {'ticker': "AAA", 'seed': 1, 'shape': [6, 10], 'dtype': "float32"}
+
+    rows, _ = load_path_set(filename, rows=slice(2, 4))
+    np.testing.assert_array_equal(rows, expected[2:4])
+
+
+def test_save_path_set_and_scaling(tmp_path):
+    filename = str(tmp_path / "paths.npy")
+    expected = normalized_paths()
+    save_path_set(filename, expected, METADATA)
+    paths, metadata = load_path_set(filename, mode="c")
+    assert read_metadata(filename) == metadata
+
+    scaled = denormalize_data(expected, 50.0)
+    np.testing.assert_allclose(np.stack(list(iter_scaled_paths(paths, 50.0))), scaled)
+    np.testing.assert_allclose(scale_path_set(paths, 50.0, out=paths), 50.0 * expected, rtol=1e-6)
+
+
+def test_scaled_path_set_indexing_matches_denormalize_data():
+    paths = normalized_paths()
+    expected = denormalize_data(paths, 50.0)
+    scaled = ScaledPathSet(paths, 50.0)
+
+    assert scaled.shape == expected.shape == (6, 9)
+    assert len(scaled) == 6
+    np.testing.assert_array_equal(scaled[2], expected[2])
+    np.testing.assert_array_equal(scaled[1:4], expected[1:4])
+    np.testing.assert_array_equal(scaled[:, 5], expected[:, 5])
+    np.testing.assert_array_equal(scaled[:, 0], expected[:, 0])
+    np.testing.assert_array_equal(scaled[-1, -3:], expected[-1, -3:])
+    np.testing.assert_array_equal(np.stack(list(scaled)), expected)
+    assert scaled[0].dtype == np.float64
+
+    with_s0 = ScaledPathSet(paths, 50.0, skip_first=False)
+    assert with_s0.shape == (6, 10)
+    np.testing.assert_array_equal(with_s0[:, 0], np.full(6, 50.0))
+
+
+@pytest.fixture
+def fake_download(monkeypatch):
+    """Replace yfinance downloads with synthetic data and count them."""
+    calls = []
+
+    def download(ticker, period=None, progress=False, **kwargs):
+        calls.append((ticker, period))
+        size = 5 if period == "1d" else {'1y': 252, '5y': 1260}[period]
+        return fixtures.synthetic_ohlcv(size)
+
+    monkeypatch.setattr(yf, "download", download)
+    return calls
+
+
+def test_simulated_path_set_is_reused(tmp_path, fake_download):
+    filename = str(tmp_path / "paths.npy")
+    created = get_simulated_data("AAA", "1y", 4, path_set_file=filename)
+    assert isinstance(created, ScaledPathSet) and created.shape == (4, 125)
+    assert sorted(os.listdir(tmp_path)) == ["paths.npy", "paths.npy.json"]
+    metadata = read_metadata(filename)
+    assert metadata['ticker'] == "AAA" and metadata['shape'] == [4, 126]
+    np.testing.assert_allclose(created[:, 0], metadata['start_price'] * np.asarray(created.paths[:, 1]))
+
+    calls = len(fake_download)
+    reused = get_simulated_data("AAA", "1y", 4, path_set_file=filename)
+    assert len(fake_download) == calls
+    np.testing.assert_array_equal(reused[:], created[:])
+
+
+def test_mismatching_path_set_raises(tmp_path, fake_download):
+    filename = str(tmp_path / "paths.npy")
+    save_path_set(filename, normalized_paths(4, 126), METADATA | {'ticker': "BBB"})
+    with pytest.raises(ValueError, match="does not match"):
+        get_simulated_data("AAA", "1y", 4, path_set_file=filename)
+    assert fake_download == []
+
+
+def test_incomplete_path_set_is_regenerated(tmp_path, fake_download):
+    filename = str(tmp_path / "paths.npy")
+    # Sidecar without model params or start price, as left by an interrupted run.
+    create_path_set(filename, 4, 126, {'ticker': "AAA", 'period': "1y"})
+    paths = get_simulated_data("AAA", "1y", 4, path_set_file=filename)
+    assert {'model_params', 'seed', 'start_price'} <= set(read_metadata(filename))
+    assert np.all(np.asarray(paths.paths[:, 0]) == 1.0)
+
+
+def test_failed_simulation_leaves_no_files(tmp_path, fake_download):
+    filename = str(tmp_path / "paths.npy")
+    # One path of 504 steps needs more history than the 252 bars of "1y".
+    with pytest.raises(ValueError, match="Not enough data"):
+        get_simulated_data("AAA", "1y", 1, path_set_file=filename)
+    assert os.listdir(tmp_path) == []
+
+
+def test_in_memory_paths(fake_download):
+    paths = get_simulated_data("AAA", "1y", 4)
+    assert isinstance(paths, np.ndarray) and paths.shape == (4, 125)
+
+
+def test_reused_path_set_plots_report(tmp_path, fake_download, monkeypatch):
+    filename = str(tmp_path / "paths.npy")
+    get_simulated_data("AAA", "1y", 4, path_set_file=filename)
+    reports = []
+    monkeypatch.setattr(getData, "plot_simulation_report", lambda *args: reports.append(args))
+
+    get_simulated_data("AAA", "1y", 4, plot_sim_report=True, path_set_file=filename)
+
+    assert len(reports) == 1
+    paths, sim_returns, real_returns = reports[0]
+    assert paths.shape == (4, 126)
+    assert sim_returns.shape == (4 * 125,)
+    assert len(real_returns) == 251
@@ -0,0 +1,71 @@
+import pytest
+
+import strategies.three_ema_crossover  # noqa: F401 (registers the strategy)
+from benchmarks.fixtures import synthetic_ohlcv
+from indicators.ema_crossover import indicator_three_ema_crossover
+from strategies.base import Strategy
+from walkForward import run_walk_forward, summarize_walk_forward, walk_forward_windows
+
+
+def test_adjacent_windows():
+    windows = walk_forward_windows(20, 10, 5)
+    assert windows == [
+        (slice(0, 10), slice(10, 15)),
+        (slice(5, 15), slice(15, 20)),
+    ]
+
+
+def test_overlapping_windows():
+    windows = walk_forward_windows(16, 10, 4, step=2)
+    assert [(train.start, test.start, test.stop) for train, test in windows] == [
+        (0, 10, 14),
+        (2, 12, 16),
+    ]
+
+
+def test_history_too_short():
+    assert walk_forward_windows(14, 10, 5) == []
+    assert len(walk_forward_windows(15, 10, 5)) == 1
+
+
+@pytest.mark.parametrize("train_size, test_size, step", [(0, 5, None), (10, 0, None), (10, 5, 0), (10, 5, -1)])
+def test_invalid_sizes(train_size, test_size, step):
+    with pytest.raises(ValueError, match="at least 1"):
+        walk_forward_windows(100, train_size, test_size, step)
+
+
+def test_run_walk_forward_rejects_invalid_sizes():
+    with pytest.raises(ValueError, match="step"):
+        run_walk_forward(synthetic_ohlcv(50), Strategy.registry["three_ema_crossover"], 10000, 0.01, 0.02,
+                         [], train_size=20, test_size=10, step=0)
+    with pytest.raises(ValueError, match="warmup"):
+        run_walk_forward(synthetic_ohlcv(50), Strategy.registry["three_ema_crossover"], 10000, 0.01, 0.02,
+                         [], train_size=20, test_size=10, warmup=-1)
+    with pytest.raises(ValueError, match="Not enough data"):
+        run_walk_forward(synthetic_ohlcv(50), Strategy.registry["three_ema_crossover"], 10000, 0.01, 0.02,
+                         [], train_size=40, test_size=20)
+
+
+def test_run_walk_forward_end_to_end():
+    data = synthetic_ohlcv(400)
+    kwargs = dict(train_size=250, test_size=50, num_paths=3, max_workers=1, seed=7)
+    strategy = Strategy.registry["three_ema_crossover"]
+
+    results = run_walk_forward(data, strategy, 10000, 0.01, 0.02, [indicator_three_ema_crossover], **kwargs)
+
+    assert len(results) == 3
+    for window, (train_slice, test_slice) in zip(results, walk_forward_windows(400, 250, 50)):
+        assert window['train_start'] == data.index[train_slice.start]
+        assert window['test_end'] == data.index[test_slice.stop - 1]
+        assert len(window['real_result']['wealth']) == 50
+        assert len(window['sim_end_wealth']) == 3
+        assert window['start_capital'] == 10000
+    assert 'indicator_three_ema_crossover' not in data  # the caller's frame is left untouched
+
+    summary = summarize_walk_forward(results)
+    assert list(summary['test_start']) == [window['test_start'] for window in results]
+    assert summary[['real_return', 'sim_mean_return']].notna().all().all()
+
+    # Window seeds derive from `seed`, so a rerun reproduces the simulated paths.
+    rerun = run_walk_forward(data, strategy, 10000, 0.01, 0.02, [indicator_three_ema_crossover], **kwargs)
+    assert [window['sim_end_wealth'] for window in rerun] == [window['sim_end_wealth'] for window in results]